@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # render di server saja, tidak perlu backend interaktif
 import matplotlib.pyplot as plt
 import seaborn as sns
+import altair as alt
 
 # =========================================
 # 1. KONFIGURASI DASHBOARD
@@ -29,31 +32,86 @@ st.markdown(
 # =========================================
 # 2. LOAD DATA
 # =========================================
-@st.cache_data
-def load_data(path: str = "harga_rumah_clean.csv") -> pd.DataFrame:
-    df = pd.read_csv(path)
-
-    # Buang kolom index yang tidak perlu jika ada
-    if "Unnamed: 0" in df.columns:
-        df = df.drop(columns=["Unnamed: 0"])
+# Kolom yang dipakai dashboard (kolom index tanpa nama di CSV tidak ikut dibaca)
+KEEP_COLS = [
+    "city", "title", "price", "location", "area", "building_area",
+    "bedrooms", "bathrooms", "garage"
+]
 
-    # Pastikan tipe data numerik
-    numeric_cols = ["price", "area", "building_area", "bedrooms", "bathrooms", "garage"]
-    for c in numeric_cols:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
+# Tipe data per kolom, supaya parser C langsung membaca dengan tipe yang benar
+COL_DTYPES = {
+    "city": "category",
+    "title": "string[pyarrow]",
+    "location": "string[pyarrow]",
+    "price": "float32",
+    "area": "float32",
+    "building_area": "float32",
+    "bedrooms": "Int16",
+    "bathrooms": "Int16",
+    "garage": "Int16",
+}
+
+# Batas titik per kota di scatter plot (sisanya disampel acak)
+SCATTER_MAX_PER_CITY = 2000
+
+# Batas sampel harga untuk kurva KDE di histogram
+KDE_MAX_SAMPLE = 2000
+
+
+# cache_resource: satu frame dipakai bersama semua sesi (tanpa copy per panggilan),
+# jadi frame hasil load_data hanya boleh dibaca, jangan diubah in-place
+@st.cache_resource
+def load_data(path: str = "harga_rumah_clean.csv") -> pd.DataFrame:
+    df = pd.read_csv(path, usecols=KEEP_COLS, dtype=COL_DTYPES, engine="c")
 
     # Harga per m² tanah (asumsi price dalam juta → hasil = juta/m²)
-    df["price_per_m2"] = np.where(
-        df["area"] > 0,
-        df["price"] / df["area"],
-        np.nan
+    # Pembagian hanya untuk luas > 0; sisanya tetap NaN (float32, sama dengan price/area)
+    price = df["price"].to_numpy(dtype=np.float32)
+    area = df["area"].to_numpy(dtype=np.float32)
+    df["price_per_m2"] = np.divide(
+        price,
+        area,
+        out=np.full(len(df), np.nan, dtype=np.float32),
+        where=area > 0
     )
 
+    # Teks pencarian (judul + lokasi) dalam huruf kecil, dibuat sekali saat load.
+    # Karena berbasis Arrow, lower/contains berjalan di kernel C milik PyArrow.
+    df["_search"] = (
+        df["title"].fillna("") + "\n" + df["location"].fillna("")
+    ).str.lower()
+
     return df
 
+
+@st.cache_resource
+def filter_arrays(_df: pd.DataFrame) -> dict:
+    # Kolom filter sebagai array numpy, dibuat sekali dan dipakai ulang oleh mask.
+    # Tipe dipatok sempit (float32/int16/kode kategori) dan contiguous supaya
+    # perbandingan di mask membaca memori sesedikit mungkin.
+    # Kamar tidur/mandi yang kosong (NA) diisi -1 agar selalu gagal filter minimal.
+    return {
+        "price": np.ascontiguousarray(_df["price"].to_numpy(dtype=np.float32)),
+        "area": np.ascontiguousarray(_df["area"].to_numpy(dtype=np.float32)),
+        "bedrooms": _df["bedrooms"].to_numpy(dtype=np.int16, na_value=-1),
+        "bathrooms": _df["bathrooms"].to_numpy(dtype=np.int16, na_value=-1),
+        "city_codes": _df["city"].cat.codes.to_numpy(),
+    }
+
+
+@st.cache_data
+def widget_bounds(_df: pd.DataFrame) -> dict:
+    # Batas slider & daftar kota dari data dasar, dihitung sekali saja
+    return {
+        "cities": sorted(_df["city"].dropna().unique().tolist()),
+        "price": (float(_df["price"].min()), float(_df["price"].max())),
+        "area": (float(_df["area"].min()), float(_df["area"].max())),
+        "bedrooms": (int(_df["bedrooms"].min()), int(_df["bedrooms"].max())),
+        "bathrooms": (int(_df["bathrooms"].min()), int(_df["bathrooms"].max())),
+    }
+
 try:
-    data = load_data()
+    df = load_data()
 except FileNotFoundError:
     st.error(
         "File `harga_rumah_clean.csv` tidak ditemukan. "
@@ -61,7 +119,9 @@ except FileNotFoundError:
     )
     st.stop()
 
-df = data.copy()
+# Data hanya dibaca (filter selalu menghasilkan frame baru), jadi tidak perlu copy
+arrays = filter_arrays(df)
+bounds = widget_bounds(df)
 
 # =========================================
 # 3. SIDEBAR FILTER
@@ -69,7 +129,7 @@ df = data.copy()
 st.sidebar.header("🔎 Filter Data")
 
 # Kota
-kota_options = sorted(df["city"].dropna().unique().tolist())
+kota_options = bounds["cities"]
 filter_kota = st.sidebar.multiselect(
     "Pilih Kota:",
     options=kota_options,
@@ -77,8 +137,7 @@ filter_kota = st.sidebar.multiselect(
 )
 
 # Range harga
-min_price = float(df["price"].min())
-max_price = float(df["price"].max())
+min_price, max_price = bounds["price"]
 filter_price = st.sidebar.slider(
     "Range Harga (dalam juta):",
     float(min_price),
@@ -87,8 +146,7 @@ filter_price = st.sidebar.slider(
 )
 
 # Range luas tanah
-min_area = float(df["area"].min())
-max_area = float(df["area"].max())
+min_area, max_area = bounds["area"]
 filter_area = st.sidebar.slider(
     "Range Luas Tanah (m²):",
     float(min_area),
@@ -97,8 +155,7 @@ filter_area = st.sidebar.slider(
 )
 
 # Minimal kamar tidur & kamar mandi
-min_bedrooms = int(df["bedrooms"].min())
-max_bedrooms = int(df["bedrooms"].max())
+min_bedrooms, max_bedrooms = bounds["bedrooms"]
 filter_bedrooms = st.sidebar.slider(
     "Minimal Jumlah Kamar Tidur:",
     min_bedrooms,
@@ -106,8 +163,7 @@ filter_bedrooms = st.sidebar.slider(
     min_bedrooms
 )
 
-min_bathrooms = int(df["bathrooms"].min())
-max_bathrooms = int(df["bathrooms"].max())
+min_bathrooms, max_bathrooms = bounds["bathrooms"]
 filter_bathrooms = st.sidebar.slider(
     "Minimal Jumlah Kamar Mandi:",
     min_bathrooms,
@@ -122,21 +178,127 @@ keyword = st.sidebar.text_input(
     placeholder="contoh: kemang, bintaro, cluster, dll."
 )
 
-# Terapkan filter
-df_filtered = df[
-    (df["city"].isin(filter_kota)) &
-    (df["price"].between(filter_price[0], filter_price[1])) &
-    (df["area"].between(filter_area[0], filter_area[1])) &
-    (df["bedrooms"] >= filter_bedrooms) &
-    (df["bathrooms"] >= filter_bathrooms)
-]
+def city_stats(df_filtered: pd.DataFrame) -> tuple:
+    # Median harga & luas rata-rata per kota lewat kode kategori + numpy.
+    # Baris hasil filter selalu punya price/area valid (NaN gagal di mask).
+    codes = df_filtered["city"].cat.codes.to_numpy()
+    cats = df_filtered["city"].cat.categories
+    price = df_filtered["price"].to_numpy(dtype=np.float64)
+    area = df_filtered["area"].to_numpy(dtype=np.float64)
+
+    counts = np.bincount(codes, minlength=len(cats))
+    present = np.flatnonzero(counts)
+
+    # Rata-rata luas = jumlah / banyaknya listing per kota
+    area_sum = np.bincount(codes, weights=area, minlength=len(cats))
+    mean_area = area_sum[present] / counts[present]
+
+    # Median: urutkan harga per kode sekali (hanya array indeks, urutan baris
+    # frame tetap), lalu ambil potongan tiap kota
+    sorted_price = price[np.argsort(codes, kind="stable")]
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    median_price = np.array(
+        [np.median(sorted_price[starts[c]:ends[c]]) for c in present]
+    )
+
+    city_price = pd.DataFrame(
+        {"city": cats[present], "price": median_price}
+    ).sort_values("price", ascending=False, ignore_index=True)
+    city_area = pd.DataFrame(
+        {"city": cats[present], "area": mean_area}
+    ).sort_values("area", ascending=False, ignore_index=True)
+
+    return city_price, city_area
+
+
+# Terapkan filter (di-cache berdasarkan nilai widget, jadi rerun karena
+# interaksi lain tidak menghitung ulang mask dan agregat per kota).
+# Slider bernilai kontinu, jadi jumlah entri dibatasi agar cache tidak terus tumbuh.
+@st.cache_data(max_entries=16)
+def apply_filters(
+    kota: tuple,
+    price_rng: tuple,
+    area_rng: tuple,
+    min_bed: int,
+    min_bath: int,
+    kw: str
+) -> tuple:
+    # Satu buffer mask yang di-AND in-place; kota dicocokkan lewat kode kategori
+    allowed_codes = df["city"].cat.categories.get_indexer(list(kota))
+
+    mask = np.ones(len(df), dtype=bool)
+    mask &= arrays["price"] >= price_rng[0]
+    mask &= arrays["price"] <= price_rng[1]
+    mask &= arrays["area"] >= area_rng[0]
+    mask &= arrays["area"] <= area_rng[1]
+    mask &= arrays["bedrooms"] >= min_bed
+    mask &= arrays["bathrooms"] >= min_bath
+    mask &= np.isin(arrays["city_codes"], allowed_codes)
+
+    df_filtered = df.iloc[mask]
+
+    if kw:
+        df_filtered = df_filtered[
+            df_filtered["_search"].str.contains(kw, regex=False, na=False)
+        ]
+
+    # Agregat per kota dipakai insight dan tab 1 (kota tanpa listing sudah
+    # dibuang di city_stats, jadi frame terfilter tidak perlu di-copy lagi)
+    city_price, city_area = city_stats(df_filtered)
+
+    return df_filtered, city_price, city_area
 
-if keyword.strip():
-    kw = keyword.strip().lower()
-    df_filtered = df_filtered[
-        df_filtered["title"].str.lower().str.contains(kw, na=False) |
-        df_filtered["location"].str.lower().str.contains(kw, na=False)
-    ]
+
+@st.cache_data(max_entries=4)
+def to_csv_bytes(filter_key: tuple, _df: pd.DataFrame) -> bytes:
+    # CSV di-cache per kombinasi filter (_df tidak di-hash), jadi rerun lain
+    # tidak men-serialisasi ulang seluruh data terfilter. Kolom bantu internal
+    # (awalan "_") dibuang di sini supaya hanya dikerjakan saat cache miss.
+    public_cols = [c for c in _df.columns if not c.startswith("_")]
+    return _df[public_cols].to_csv(index=False).encode("utf-8")
+
+
+@st.cache_data(max_entries=4)
+def listing_labels(filter_key: tuple, _df: pd.DataFrame) -> list:
+    # Label selectbox simulasi KPR dibangun dengan operasi string vektor
+    # (tanpa iterrows), di-cache per kombinasi filter
+    labels = (
+        "[" + _df["city"].astype(str) + "] "
+        + _df["location"].fillna("").str.slice(0, 25) + "... | "
+        + _df["price"].map("{:,.0f}".format) + " jt"
+    )
+    return labels.tolist()
+
+
+@st.cache_data(max_entries=4)
+def price_histogram(filter_key: tuple, _df: pd.DataFrame) -> tuple:
+    # Bin histogram harga + kurva KDE, di-cache per kombinasi filter.
+    # KDE dihitung dari sampel (maks. ~KDE_MAX_SAMPLE titik) di grid 200 titik,
+    # bandwidth aturan Scott, lalu diskalakan ke jumlah listing per bin.
+    harga = _df["price"].to_numpy(dtype=np.float64)
+    counts, edges = np.histogram(harga, bins=30)
+
+    sampel = harga[::max(1, len(harga) // KDE_MAX_SAMPLE)]
+    bw = sampel.std() * len(sampel) ** (-1 / 5)
+    if not bw > 0:
+        return counts, edges, None, None
+
+    grid = np.linspace(edges[0], edges[-1], 200)
+    z = (grid[:, None] - sampel[None, :]) / bw
+    density = np.exp(-0.5 * z ** 2).sum(axis=1) / (len(sampel) * bw * np.sqrt(2 * np.pi))
+    return counts, edges, grid, density * len(harga) * (edges[1] - edges[0])
+
+
+filter_key = (
+    tuple(filter_kota),
+    filter_price,
+    filter_area,
+    filter_bedrooms,
+    filter_bathrooms,
+    keyword.strip().lower()
+)
+df_filtered, city_price, city_area = apply_filters(*filter_key)
 
 # Handling jika tidak ada data setelah filter
 if df_filtered.empty:
@@ -148,11 +310,18 @@ if df_filtered.empty:
 # =========================================
 st.subheader("🔢 Ringkasan Utama (KPI)")
 
+# Semua agregat KPI dihitung dalam satu panggilan agg
+stats = df_filtered.agg({
+    "price": ["mean", "median"],
+    "area": "mean",
+    "price_per_m2": "mean",
+})
+
 total_listing = len(df_filtered)
-avg_price = df_filtered["price"].mean()
-median_price = df_filtered["price"].median()
-avg_area = df_filtered["area"].mean()
-avg_price_m2 = df_filtered["price_per_m2"].mean()
+avg_price = stats.at["mean", "price"]
+median_price = stats.at["median", "price"]
+avg_area = stats.at["mean", "area"]
+avg_price_m2 = stats.at["mean", "price_per_m2"]
 
 col1, col2, col3, col4, col5 = st.columns(5)
 
@@ -164,12 +333,6 @@ col5.metric("Rata-rata Harga per m² (juta/m²)", f"{avg_price_m2:,.2f}")
 
 # Insight singkat kota termahal (median)
 st.markdown("### 💡 Insight Singkat")
-city_price = (
-    df_filtered.groupby("city")["price"]
-    .median()
-    .sort_values(ascending=False)
-    .reset_index()
-)
 top_city = city_price.iloc[0]
 st.write(
     f"- Kota dengan **median harga tertinggi** (data terfilter): "
@@ -191,45 +354,20 @@ with tab1:
 
     # Median harga per kota
     st.markdown("**Median Harga per Kota (juta)**")
-    city_price = (
-        df_filtered.groupby("city")["price"]
-        .median()
-        .sort_values(ascending=False)
-        .reset_index()
-    )
-
-    fig1, ax1 = plt.subplots(figsize=(8, 4))
-    sns.barplot(
-        data=city_price,
-        x="city",
-        y="price",
-        ax=ax1
+    # Chart agregat kecil digambar di browser (Vega-Lite), tanpa render matplotlib
+    chart_price = alt.Chart(city_price).mark_bar().encode(
+        x=alt.X("city:N", sort="-y", title="Kota", axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y("price:Q", title="Median Harga (juta)"),
     )
-    ax1.set_xlabel("Kota")
-    ax1.set_ylabel("Median Harga (juta)")
-    ax1.tick_params(axis='x', rotation=45)
-    st.pyplot(fig1)
+    st.altair_chart(chart_price, use_container_width=True)
 
     # Luas rata-rata per kota
     st.markdown("**Luas Tanah Rata-rata per Kota (m²)**")
-    city_area = (
-        df_filtered.groupby("city")["area"]
-        .mean()
-        .sort_values(ascending=False)
-        .reset_index()
-    )
-
-    fig2, ax2 = plt.subplots(figsize=(8, 4))
-    sns.barplot(
-        data=city_area,
-        x="city",
-        y="area",
-        ax=ax2
+    chart_area = alt.Chart(city_area).mark_bar().encode(
+        x=alt.X("city:N", sort="-y", title="Kota", axis=alt.Axis(labelAngle=-45)),
+        y=alt.Y("area:Q", title="Luas Tanah Rata-rata (m²)"),
     )
-    ax2.set_xlabel("Kota")
-    ax2.set_ylabel("Luas Tanah Rata-rata (m²)")
-    ax2.tick_params(axis='x', rotation=45)
-    st.pyplot(fig2)
+    st.altair_chart(chart_area, use_container_width=True)
 
     # Top N listing termahal
     st.markdown("**Top Listing Termahal (berdasarkan harga)**")
@@ -254,31 +392,50 @@ with tab2:
     # Histogram harga
     with col_d1:
         st.markdown("**Distribusi Harga (juta)**")
+        counts, edges, kde_x, kde_y = price_histogram(filter_key, df_filtered)
         fig3, ax3 = plt.subplots(figsize=(6, 4))
-        sns.histplot(df_filtered["price"], bins=30, kde=True, ax=ax3)
+        ax3.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color="C0", alpha=0.6)
+        if kde_x is not None:
+            ax3.plot(kde_x, kde_y, color="C0")
         ax3.set_xlabel("Harga (juta)")
+        ax3.set_ylabel("Count")
         st.pyplot(fig3)
+        plt.close(fig3)
 
     # Boxplot harga per kota
     with col_d2:
         st.markdown("**Boxplot Harga per Kota**")
-        df_box = df_filtered.copy()
-        fig4, ax4 = plt.subplots(figsize=(6, 4))
-        sns.boxplot(
-            data=df_box,
-            x="city",
-            y="price",
-            ax=ax4
+        # Hanya kolom yang dipakai yang dikirim ke browser; kota kosong dibuang
+        # di potongan kecil ini saja agar tidak tampil di sumbu
+        df_box = pd.DataFrame({
+            "city": df_filtered["city"].cat.remove_unused_categories(),
+            "price": df_filtered["price"],
+        })
+        chart_box = alt.Chart(df_box).mark_boxplot().encode(
+            x=alt.X("city:N", title="Kota", axis=alt.Axis(labelAngle=-45)),
+            y=alt.Y("price:Q", title="Harga (juta)"),
         )
-        ax4.set_xlabel("Kota")
-        ax4.set_ylabel("Harga (juta)")
-        ax4.tick_params(axis='x', rotation=45)
-        st.pyplot(fig4)
+        st.altair_chart(chart_box, use_container_width=True)
 
     st.markdown("**Scatter Plot: Luas Tanah vs Harga (warna berdasarkan kota)**")
+    df_scatter = df_filtered
+    if len(df_filtered) > SCATTER_MAX_PER_CITY:
+        # Acak sekali lalu ambil maksimal N baris pertama tiap kota
+        df_acak = df_filtered.sample(frac=1, random_state=0)
+        df_scatter = df_acak[
+            df_acak.groupby("city", observed=True, sort=False).cumcount() < SCATTER_MAX_PER_CITY
+        ]
+
+    # Kota kosong dibuang hanya di data scatter agar legenda tidak menampilkannya
+    df_scatter = pd.DataFrame({
+        "area": df_scatter["area"],
+        "price": df_scatter["price"],
+        "city": df_scatter["city"].cat.remove_unused_categories(),
+    })
+
     fig5, ax5 = plt.subplots(figsize=(8, 5))
     sns.scatterplot(
-        data=df_filtered,
+        data=df_scatter,
         x="area",
         y="price",
         hue="city",
@@ -289,6 +446,7 @@ with tab2:
     ax5.set_ylabel("Harga (juta)")
     ax5.legend(bbox_to_anchor=(1.05, 1), loc="upper left", borderaxespad=0.)
     st.pyplot(fig5)
+    plt.close(fig5)
 
 # -------------------------------------------------
 # TAB 3 - DATA DETAIL
@@ -303,9 +461,12 @@ with tab3:
     ]
     cols_available = [c for c in default_cols if c in df_filtered.columns]
 
+    # Kolom bantu internal (awalan "_") tidak ditampilkan / di-download
+    public_cols = [c for c in df_filtered.columns if not c.startswith("_")]
+
     selected_cols = st.multiselect(
         "Pilih kolom yang ingin ditampilkan:",
-        options=df_filtered.columns.tolist(),
+        options=public_cols,
         default=cols_available
     )
 
@@ -313,7 +474,7 @@ with tab3:
 
     # Download CSV hasil filter
     st.markdown("### 💾 Download Data")
-    csv = df_filtered.to_csv(index=False).encode("utf-8")
+    csv = to_csv_bytes(filter_key, df_filtered)
     st.download_button(
         label="📥 Download CSV (data terfilter)",
         data=csv,
@@ -352,20 +513,15 @@ with tab4:
     if mode == "Pilih dari listing terfilter":
         # Buat opsi selectbox dari df_filtered
         # Tampilkan city - location - (harga juta)
-        df_sel = df_filtered.copy()
-        df_sel = df_sel.reset_index(drop=True)
-
-        def make_label(row):
-            return f"[{row['city']}] {str(row['location'])[:25]}... | {row['price']:,.0f} jt"
-
-        options = [make_label(row) for _, row in df_sel.iterrows()]
+        options = listing_labels(filter_key, df_filtered)
         idx = st.selectbox(
             "Pilih listing:",
-            options=range(len(df_sel)),
+            options=range(len(df_filtered)),
             format_func=lambda i: options[i]
         )
 
-        selected_row = df_sel.iloc[idx]
+        # iloc bersifat posisional, jadi index asli tidak perlu di-reset
+        selected_row = df_filtered.iloc[idx]
         harga_juta = float(selected_row["price"])
         info_listing = (
             f"Listing terpilih: **{selected_row['title']}** "